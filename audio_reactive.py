@@ -0,0 +1,316 @@
+import argparse
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+# Colours of the frequency bands in 'spectrum' mode, from bass to treble (WRGB)
+BAND_COLORS = [
+    (0, 255, 20, 0),     # Red
+    (0, 255, 120, 0),    # Orange
+    (0, 255, 190, 60),   # Gold
+    (0, 40, 255, 40),    # Green
+    (0, 60, 140, 255),   # Ice blue
+    (40, 120, 120, 255), # Cold white
+]
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        """
+        Fixed-size buffer holding the most recent audio samples.
+
+        Writing never blocks and never grows the buffer: the oldest samples are
+        overwritten, so a slow consumer only ever sees the latest audio.
+
+        :param capacity: Number of samples kept.
+        """
+        self.samples = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.position = 0  # Index of the oldest sample, i.e. the next one to overwrite
+        self.lock = threading.Lock()
+
+    def write(self, block):
+        """
+        Append a block of samples, overwriting the oldest ones.
+
+        :param block: 1-D float array of samples.
+        """
+        block = block[-self.capacity:]
+        with self.lock:
+            end = self.position + len(block)
+            if end <= self.capacity:
+                self.samples[self.position:end] = block
+            else:
+                split = self.capacity - self.position
+                self.samples[self.position:] = block[:split]
+                self.samples[:end - self.capacity] = block[split:]
+            self.position = end % self.capacity
+
+    def latest(self, out):
+        """
+        Copy the most recent samples, oldest first, into a preallocated array.
+
+        :param out: 1-D float array receiving the last len(out) samples.
+        :return: out
+        """
+        count = len(out)
+        with self.lock:
+            start = (self.position - count) % self.capacity
+            if start + count <= self.capacity:
+                out[:] = self.samples[start:start + count]
+            else:
+                split = self.capacity - start
+                out[:split] = self.samples[start:]
+                out[split:] = self.samples[:count - split]
+        return out
+
+
+class AudioStream:
+    def __init__(self, source='-', block_size=512, window_size=2048, sample_rate=44100, channels=1,
+                 sample_width=2, realtime=None):
+        """
+        Read PCM audio in small blocks into a ring buffer on a background thread.
+
+        :param source: Path of a WAV file, or '-' for raw little-endian PCM on stdin.
+        :param block_size: Number of samples per block read. Smaller blocks lower the latency.
+        :param window_size: Number of samples available for analysis.
+        :param sample_rate: Sample rate of raw PCM on stdin (WAV files use their header).
+        :param channels: Number of channels of raw PCM on stdin.
+        :param sample_width: Bytes per sample of raw PCM on stdin.
+        :param realtime: If True, reading is paced to the audio clock, as if the audio
+                         was played live. Defaults to True for files, False for stdin.
+        """
+        self.block_size = block_size
+        self.window_size = window_size
+        if source == '-':
+            self._file = sys.stdin.buffer
+            self._wave = None
+            self.sample_rate, self.channels, self.sample_width = sample_rate, channels, sample_width
+        else:
+            self._wave = wave.open(source, 'rb')
+            self._file = None
+            self.sample_rate = self._wave.getframerate()
+            self.channels = self._wave.getnchannels()
+            self.sample_width = self._wave.getsampwidth()
+        if self.sample_width not in SAMPLE_TYPES:
+            raise ValueError(f"{8 * self.sample_width}-bit audio is not supported")
+        self.realtime = self._wave is not None if realtime is None else realtime
+        self.ring = RingBuffer(max(window_size, block_size) * 2)
+        self.block_duration = block_size / self.sample_rate
+        # Delay of the centre of the analysis window behind its newest sample (group delay of the window)
+        self.window_delay = window_size / 2 / self.sample_rate
+        self.arrival_time = None  # time.perf_counter() when the latest block was read
+        self.finished = False
+        self._closed = False
+        self.new_block = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, name='audio-reader', daemon=True)
+
+    def start(self):
+        """
+        Start reading audio on the background thread.
+        """
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Stop reading and close the audio file.
+
+        A running reader thread stops after its current block and closes the file itself.
+        """
+        self._closed = True
+        if not self._thread.is_alive():
+            self._close_file()
+
+    def _close_file(self):
+        if self._wave is not None:
+            self._wave.close()
+
+    def _read_block(self):
+        if self._wave is not None:
+            return self._wave.readframes(self.block_size)
+        return self._file.read(self.block_size * self.channels * self.sample_width)
+
+    def _read_loop(self):
+        sample_type = SAMPLE_TYPES[self.sample_width]
+        scale = 128.0 if self.sample_width == 1 else float(np.iinfo(sample_type).max)
+        frame_bytes = self.channels * self.sample_width
+        start_time = time.perf_counter()
+        samples_read = 0
+
+        try:
+            while not self._closed:
+                data = self._read_block()
+                usable = len(data) - len(data) % frame_bytes
+                if not usable:
+                    break
+                block = np.frombuffer(data[:usable], dtype=sample_type).astype(np.float32)
+                if self.sample_width == 1:
+                    block -= 128  # 8-bit WAV is unsigned
+                block = block.reshape(-1, self.channels).mean(axis=1) / scale
+
+                if self.realtime:
+                    # Deliver the block when it would have been recorded by a live source
+                    samples_read += len(block)
+                    time.sleep(max(0.0, start_time + samples_read / self.sample_rate - time.perf_counter()))
+
+                self.ring.write(block)
+                self.arrival_time = time.perf_counter()
+                self.new_block.set()
+        finally:
+            # Also on read errors, so consumers waiting for blocks stop
+            self._close_file()
+            self.finished = True
+            self.new_block.set()
+
+    def wait_for_block(self, timeout=1.0):
+        """
+        Wait until a new block has been read.
+
+        :return: True if a new block is available, False on timeout or end of stream.
+        """
+        if not self.new_block.wait(timeout):
+            return False
+        self.new_block.clear()
+        return not self.finished
+
+
+class BandAnalyzer:
+    def __init__(self, sample_rate, window_size=2048, num_bands=3, min_frequency=40.0,
+                 max_frequency=12000.0, attack=0.6, release=0.15, gain_decay=0.995, noise_floor=1e-4):
+        """
+        Compute the energy of logarithmically spaced frequency bands with a windowed FFT.
+
+        Levels are normalised by an automatic gain per band, so quiet and loud music
+        both use the full range from 0 to 1.
+
+        :param sample_rate: Sample rate of the audio.
+        :param window_size: Number of samples per FFT.
+        :param num_bands: Number of frequency bands.
+        :param min_frequency: Lower edge of the lowest band in Hz.
+        :param max_frequency: Upper edge of the highest band in Hz.
+        :param attack: Smoothing factor for rising levels (1 = no smoothing).
+        :param release: Smoothing factor for falling levels (1 = no smoothing).
+        :param gain_decay: Factor by which the automatic gain forgets loud passages per frame.
+        :param noise_floor: Smallest energy treated as signal, relative to a full-scale sine.
+                            Keeps the automatic gain from amplifying silence and leakage.
+        """
+        self.window_size = window_size
+        self.window = np.hanning(window_size).astype(np.float32)
+        self.samples = np.zeros(window_size, dtype=np.float32)
+        frequencies = np.fft.rfftfreq(window_size, 1 / sample_rate)
+        max_frequency = min(max_frequency, sample_rate / 2)
+        edges = np.geomspace(min_frequency, max_frequency, num_bands + 1)
+        self.bands = []
+        for low, high in zip(edges[:-1], edges[1:]):
+            indices = np.nonzero((frequencies >= low) & (frequencies < high))[0]
+            if len(indices) == 0:  # Band narrower than one FFT bin
+                indices = np.array([np.argmin(np.abs(frequencies - low))])
+            self.bands.append((indices[0], indices[-1] + 1))
+        self.levels = np.zeros(num_bands, dtype=np.float32)
+        full_scale = float(self.window.sum() / 2) ** 2  # Energy of a full-scale sine in its FFT bin
+        self.floor = noise_floor * full_scale
+        self.peaks = np.full(num_bands, self.floor, dtype=np.float32)
+        self.attack = attack
+        self.release = release
+        self.gain_decay = gain_decay
+
+    def analyze(self, samples):
+        """
+        Update the band levels from the latest window of samples.
+
+        :param samples: 1-D float array of window_size samples.
+        :return: Array of band levels between 0 and 1, from bass to treble.
+        """
+        spectrum = np.abs(np.fft.rfft(samples * self.window)) ** 2
+        energies = np.array([spectrum[start:end].mean() for start, end in self.bands], dtype=np.float32)
+
+        self.peaks = np.maximum(np.maximum(self.peaks * self.gain_decay, energies), self.floor)
+        targets = np.sqrt(energies / self.peaks)
+        factors = np.where(targets > self.levels, self.attack, self.release)
+        self.levels += factors * (targets - self.levels)
+        return self.levels
+
+
+def latency_report(latencies, fps, block_duration=0.0, window_delay=0.0):
+    """
+    Summarise measured audio-to-light latencies.
+
+    Two latencies are reported: from the first sample of the newest block
+    (mean, p95, max), which is checked against the budget, and from the centre
+    of the analysis window (window_mean, window_p95, window_max), which is when
+    the analysed sound was heard on average.
+
+    :param latencies: List of times in seconds from the arrival of the newest
+                      block to all light strings being updated.
+    :param fps: Frames per second, the frame period is the latency budget.
+    :param block_duration: Duration of an audio block in seconds.
+    :param window_delay: Group delay of the analysis window in seconds.
+    :return: Dict with frames, the latencies in seconds, the window delay and the
+             number of frames over budget.
+    """
+    report = {'frames': len(latencies), 'window_delay': window_delay, 'over_budget': 0}
+    for prefix in ('', 'window_'):
+        report.update({prefix + 'mean': 0.0, prefix + 'p95': 0.0, prefix + 'max': 0.0})
+    if not latencies:
+        return report
+
+    values = np.asarray(latencies)
+    for prefix, offset in (('', block_duration), ('window_', window_delay)):
+        report[prefix + 'mean'] = float(values.mean()) + offset
+        report[prefix + 'p95'] = float(np.percentile(values, 95)) + offset
+        report[prefix + 'max'] = float(values.max()) + offset
+    report['over_budget'] = int((values + block_duration > 1 / fps).sum())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lichterketten im Takt der Musik steuern.")
+    parser.add_argument('source', help="WAV-Datei oder '-' für rohes PCM (little-endian) auf stdin")
+    parser.add_argument('--mode', choices=['spectrum', 'brightness'], default='spectrum')
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--bands', type=int, default=3)
+    parser.add_argument('--block-size', type=int, default=512, help="Samples pro gelesenem Block")
+    parser.add_argument('--window-size', type=int, default=2048, help="Samples pro FFT")
+    parser.add_argument('--rate', type=int, default=44100, help="Abtastrate von PCM auf stdin")
+    parser.add_argument('--channels', type=int, default=1, help="Kanäle von PCM auf stdin")
+    parser.add_argument('--pace', action='store_true',
+                        help="PCM auf stdin im Takt der Abtastrate lesen (z.B. bei einer Datei über cat)")
+    parser.add_argument('--emulate', type=int, metavar='DEVICES',
+                        help="Emulierte Lichterketten statt echter Geräte verwenden")
+    args = parser.parse_args()
+
+    from light_string_manager import LightStringManager
+    if args.emulate:
+        from headless import create_light_strings
+        manager = LightStringManager(light_strings=create_light_strings(args.emulate, 400))
+    else:
+        manager = LightStringManager()
+    manager.turn_on_all()
+
+    stream = AudioStream(args.source, block_size=args.block_size, window_size=args.window_size,
+                         sample_rate=args.rate, channels=args.channels, realtime=args.pace or None)
+    try:
+        report = manager.run_audio_effect(stream, mode=args.mode, fps=args.fps, num_bands=args.bands)
+    except KeyboardInterrupt:
+        print("Unterbrechung durch Benutzer erkannt.")
+        return
+    finally:
+        stream.close()
+        manager.turn_off_all()
+
+    print(f"Frames: {report['frames']}, Latenz Audio→Licht ab neuestem Block: Mittel {report['mean'] * 1000:.1f} ms, "
+          f"95% {report['p95'] * 1000:.1f} ms, Max {report['max'] * 1000:.1f} ms "
+          f"(Budget {1000 / args.fps:.1f} ms, {report['over_budget']} Frames darüber)")
+    print(f"Ab Mitte des Analysefensters (+{report['window_delay'] * 1000:.1f} ms): "
+          f"Mittel {report['window_mean'] * 1000:.1f} ms, 95% {report['window_p95'] * 1000:.1f} ms, "
+          f"Max {report['window_max'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
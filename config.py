@@ -27,4 +27,27 @@ LIGHT_STRINGS = [
         'mac_address': '0c:8b:95:7b:a1:55',
         'position': 7,
     }
-]
\ No newline at end of file
+]
+
+# Directory for prebuilt frames and movies (see frame_cache), reused across restarts.
+# None keeps the cache in memory only.
+FRAME_CACHE_DIR = None
+
+# Chrome trace of a show run (open in https://ui.perfetto.dev or chrome://tracing).
+# None disables tracing.
+TRACE_FILE = None
+# Fraction of frames recorded in the trace (e.g. 0.1 = every tenth frame)
+TRACE_SAMPLE_RATE = 1.0
+
+# Control operations (turn on/off, set mode) run concurrently on all devices.
+# Time in seconds to wait for a device and number of retries per device.
+CONTROL_TIMEOUT = 2.0
+CONTROL_RETRIES = 2
+
+# Spatial map of the tower (see spatial_effects.LEDMap).
+# File with one 'x,y,z' line per LED, or None to generate a helix model.
+TOWER_MAP_FILE = None
+TOWER_LEDS_PER_STRING = 400
+TOWER_RADIUS = 1.0  # metres
+TOWER_HEIGHT = 10.0  # metres
+TOWER_TURNS = 20
@@ -0,0 +1,164 @@
+import functools
+import threading
+import time
+from collections import namedtuple
+
+from config import CONTROL_TIMEOUT, CONTROL_RETRIES
+from tracing import get_tracer
+
+ControlResult = namedtuple('ControlResult', ['device', 'ok', 'attempts', 'elapsed', 'error'])
+
+# Calls per device that were still running when run_on_all returned
+_running = {}
+# Notified whenever a call finishes
+_finished = threading.Condition()
+
+
+class _Attempt:
+    def __init__(self, device, operation, call):
+        """
+        A single call of a control operation running in its own daemon thread.
+
+        Daemon threads are used on purpose: a device that never answers must not
+        keep the program from exiting (e.g. during shutdown in main.py).
+        """
+        self.device = device
+        self.call = call  # Identifies the run_on_all call that started the attempt
+        self.error = None
+        self.finished = False
+        self.start_time = None
+        self.end_time = None
+        self._operation = operation
+        self._thread = threading.Thread(target=self._run, name=f"control-{device}", daemon=True)
+
+    def _run(self):
+        try:
+            with get_tracer().span('control', device=self.device):
+                self._operation()
+        except Exception as e:
+            self.error = e
+        finally:
+            with _finished:
+                self.end_time = time.perf_counter()
+                self.finished = True
+                _finished.notify_all()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self._thread.start()
+
+
+def set_request_timeout(interface, timeout):
+    """
+    Give every HTTP request of an xled control interface a timeout.
+
+    xled does not pass a timeout to requests, so a device that stops answering
+    would block the calling thread forever.
+
+    :param interface: xled.ControlInterface or xled.HighControlInterface.
+    :param timeout: Connect and read timeout in seconds.
+    """
+    session = interface.session
+    session.request = functools.partial(type(session).request, session, timeout=timeout)
+
+
+def run_on_all(operations, timeout=CONTROL_TIMEOUT, retries=CONTROL_RETRIES, retry_delay=0.2):
+    """
+    Run control operations (turn on/off, set mode, ...) on several devices concurrently.
+
+    All devices are contacted at the same time, so a round takes as long as the
+    slowest device, bounded by the timeout. Devices that failed or timed out are
+    retried in the next round, up to the given number of retries.
+
+    A device is never called twice at the same time: while an earlier call is
+    still running (from this or a previous run_on_all), it is waited for instead
+    of starting a new one, and the operation starts as soon as that call ends. The operations should therefore use requests with a
+    timeout themselves (see set_request_timeout), so such calls end.
+
+    :param operations: Dict mapping a device name (e.g. MAC address) to a callable
+                       without arguments performing the operation on that device.
+    :param timeout: Time in seconds to wait for each call.
+    :param retries: Number of retries for failed or timed out calls.
+    :param retry_delay: Time in seconds to wait before retrying.
+    :return: List of ControlResult, one per device, in the order of operations. Its elapsed
+             time runs from the start until the device answered (or until giving up).
+    """
+    call = object()
+    start_time = time.perf_counter()
+    results = {}
+    pending = list(operations)
+    attempts = dict.fromkeys(operations, 0)
+    errors = {}
+
+    def start(device):
+        attempt = _Attempt(device, operations[device], call)
+        attempts[device] += 1
+        _running[device] = attempt
+        attempt.start()
+        return attempt
+
+    def deadline(attempt):
+        # Each call gets `timeout` seconds, a call still running from earlier is
+        # waited for up to `timeout` seconds from the start of the round
+        return (attempt.start_time if attempt.call is call else round_start) + timeout
+
+    round_start = start_time
+    for round_index in range(retries + 1):
+        if not pending:
+            break
+        if round_index > 0:
+            time.sleep(retry_delay)
+
+        round_start = time.perf_counter()
+        running = []
+        for device in pending:
+            attempt = _running.get(device)
+            running.append(attempt if attempt is not None and not attempt.finished else start(device))
+
+        with _finished:
+            while True:
+                # A device whose earlier call has finished is free, call it right away
+                for index, attempt in enumerate(running):
+                    if attempt.finished and attempt.call is not call:
+                        running[index] = start(attempt.device)
+                now = time.perf_counter()
+                waiting = [attempt for attempt in running if not attempt.finished and deadline(attempt) > now]
+                if not waiting:
+                    break
+                _finished.wait(min(deadline(attempt) for attempt in waiting) - now)
+
+        pending = []
+        for attempt in running:
+            device = attempt.device
+            if not attempt.finished:
+                if attempt.call is call:
+                    errors[device] = TimeoutError(f"keine Antwort innerhalb von {timeout} s")
+                else:
+                    errors[device] = TimeoutError("vorheriger Aufruf läuft noch")
+                pending.append(device)
+                continue
+            del _running[device]
+            if attempt.error is None:
+                results[device] = ControlResult(device, True, attempts[device], attempt.end_time - start_time, None)
+            else:
+                errors[device] = attempt.error
+                pending.append(device)
+
+    for device in pending:
+        results[device] = ControlResult(
+            device, False, attempts[device], time.perf_counter() - start_time, errors[device])
+
+    return [results[device] for device in operations]
+
+
+def print_report(action, results):
+    """
+    Print an aggregated report of a control operation.
+
+    :param action: Description of the operation (e.g. 'Einschalten').
+    :param results: List of ControlResult as returned by run_on_all.
+    """
+    failed = [result for result in results if not result.ok]
+    print(f"{action}: {len(results) - len(failed)}/{len(results)} Geräte erfolgreich.")
+    for result in failed:
+        print(f"  {result.device}: fehlgeschlagen nach {result.attempts} Versuch(en): {result.error}")
@@ -0,0 +1,353 @@
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import spatial_effects
+from config import LIGHT_STRINGS
+from device_control import run_on_all, print_report
+from emulated_display import EmulatedDisplay
+from frame_pool import FramePool
+from tracing import get_tracer
+
+DEFAULT_ADDRESS = ('127.0.0.1', 6010)
+DEFAULT_AUTHKEY = b'xmas-lights'
+# Connections queued before accept(); workers usually connect at the same time
+LISTEN_BACKLOG = 64
+
+
+class Coordinator:
+    def __init__(self, light_strings=LIGHT_STRINGS, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+        """
+        Hand out light strings to worker processes and drive them with frame timestamps.
+
+        Each worker renders and sends the part of the effect belonging to its
+        strings. The coordinator only issues the frame index, the effect time and
+        the wall clock time at which the frame has to be shown.
+
+        :param light_strings: Light string configuration (e.g. config.LIGHT_STRINGS).
+        :param address: (host, port) on which workers connect.
+        :param authkey: Shared secret of coordinator and workers.
+        """
+        self.light_strings = sorted(light_strings, key=lambda x: x['position'])
+        self.listener = Listener(address, authkey=authkey, backlog=max(LISTEN_BACKLOG, len(self.light_strings)))
+        self.address = self.listener.address
+        self.workers = []  # dicts with 'name', 'connection', 'clock_offset', 'mac_addresses'
+
+    def accept_workers(self, num_workers, timeout=None, processes=None):
+        """
+        Wait for workers to connect and assign the light strings to them.
+
+        Each worker gets a contiguous block of strings (by position).
+
+        :param num_workers: Number of workers to wait for.
+        :param timeout: Time in seconds to wait for all workers to connect, None to wait forever.
+        :param processes: Optional local worker processes. If one of them ends before
+                          all workers have connected, waiting is given up.
+        """
+        # Listener.accept() cannot time out, so connections are accepted on a daemon thread
+        connections = queue.Queue()
+        threading.Thread(target=self._accept_loop, args=(num_workers, connections),
+                         name='accept-workers', daemon=True).start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while len(self.workers) < num_workers:
+            try:
+                connection = connections.get(timeout=0.1)
+            except queue.Empty:
+                if processes is not None and not all(process.is_alive() for process in processes):
+                    raise RuntimeError("A worker process ended before all workers connected")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Only {len(self.workers)} of {num_workers} workers connected "
+                                       f"within {timeout} s")
+                continue
+            _, name = connection.recv()
+            self.workers.append({
+                'name': name,
+                'connection': connection,
+                'clock_offset': self._measure_clock_offset(connection),
+                'mac_addresses': [],
+            })
+            print(f"Worker verbunden: {name}")
+
+        # Split the strings into contiguous blocks of (almost) equal size
+        for i, light in enumerate(self.light_strings):
+            worker = self.workers[i * len(self.workers) // len(self.light_strings)]
+            worker['mac_addresses'].append(light['mac_address'].lower())
+
+        for worker in self.workers:
+            worker['connection'].send(('assign', worker['mac_addresses']))
+            print(f"{worker['name']}: {', '.join(worker['mac_addresses'])}")
+
+        # Wait until all workers have set up their devices
+        for worker in self.workers:
+            worker['connection'].recv()
+
+    def _accept_loop(self, num_workers, connections):
+        accepted = 0
+        while accepted < num_workers:
+            try:
+                connections.put(self.listener.accept())
+                accepted += 1
+            except (EOFError, ConnectionError, AuthenticationError) as e:
+                # Only this connection failed (e.g. a wrong authkey), keep accepting
+                print(f"Verbindung eines Workers fehlgeschlagen: {e!r}")
+            except OSError:  # Listener closed
+                return
+
+    @staticmethod
+    def _measure_clock_offset(connection, rounds=5):
+        """
+        Estimate the offset of the worker clock, keeping the round trip with the lowest latency.
+        """
+        best_round_trip, best_offset = None, 0.0
+        for _ in range(rounds):
+            sent = time.time()
+            connection.send(('ping',))
+            _, worker_time = connection.recv()
+            received = time.time()
+            if best_round_trip is None or received - sent < best_round_trip:
+                best_round_trip = received - sent
+                best_offset = worker_time - (sent + received) / 2
+        return best_offset
+
+    def run_effect(self, effect_name, duration=10, fps=30, lead_time=0.05, **effect_args):
+        """
+        Run an effect from spatial_effects on all workers.
+
+        :param effect_name: Name of the effect function (e.g. 'vertical_sweep').
+        :param duration: Total duration of the effect in seconds.
+        :param fps: Frames per second.
+        :param lead_time: Time in seconds between issuing a frame and showing it,
+                          workers use it to render and to absorb network jitter.
+        :param effect_args: Keyword arguments for the effect function.
+        :return: Dict mapping each worker name to its statistics.
+        """
+        if effect_name not in spatial_effects.EFFECTS:
+            raise ValueError(f"Unknown effect '{effect_name}', expected one of {spatial_effects.EFFECTS}")
+        for worker in self.workers:
+            worker['connection'].send(('effect', effect_name, effect_args))
+
+        tracer = get_tracer()
+        start_time = time.time() + lead_time
+        for index in range(int(duration * fps)):
+            with tracer.frame():
+                show_time = start_time + index / fps
+                with tracer.span('issue_frame'):
+                    for worker in self.workers:
+                        worker['connection'].send(('frame', index, index / fps, show_time + worker['clock_offset']))
+                # Issue the next frame `lead_time` before it has to be shown
+                with tracer.span('sleep'):
+                    time.sleep(max(0.0, show_time + 1 / fps - lead_time - time.time()))
+
+        stats = {}
+        for worker in self.workers:
+            worker['connection'].send(('stop',))
+        for worker in self.workers:
+            _, stats[worker['name']] = worker['connection'].recv()
+        return stats
+
+    def shutdown(self):
+        """
+        Stop all workers and close the listener.
+        """
+        for worker in self.workers:
+            try:
+                worker['connection'].send(('shutdown',))
+                worker['connection'].close()
+            except OSError:
+                pass
+        self.workers = []
+        self.listener.close()
+
+
+class Worker:
+    def __init__(self, name, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY, emulate=False):
+        """
+        Render and send the part of an effect belonging to the light strings
+        assigned by the coordinator.
+
+        :param name: Name of the worker, shown by the coordinator.
+        :param address: (host, port) of the coordinator.
+        :param authkey: Shared secret of coordinator and workers.
+        :param emulate: If True, use EmulatedDisplay instead of real devices.
+        """
+        self.name = name
+        self.address = address
+        self.authkey = authkey
+        self.emulate = emulate
+        self.tower_map = spatial_effects.load_tower_map()
+        self.led_map = None
+        self.displays = {}
+        self.effect = None
+        self.frame = None
+        self.frame_pool = FramePool()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.stats = {'frames': 0, 'dropped_frames': 0, 'late_frames': 0,
+                      'max_lateness': 0.0, 'render_time': 0.0}
+
+    def _create_displays(self, mac_addresses):
+        if self.emulate:
+            return {mac: EmulatedDisplay(mac, self.tower_map.slices[mac].stop - self.tower_map.slices[mac].start)
+                    for mac in mac_addresses}
+
+        # Discover the real devices and keep the ones assigned to this worker
+        from light_string_manager import LightStringManager
+        manager = LightStringManager()
+        displays = {light['mac_address']: light['led_display']
+                    for light in manager.light_strings if light['mac_address'] in mac_addresses}
+        for mac in mac_addresses:
+            if mac not in displays:
+                print(f"{self.name}: Gerät mit MAC-Adresse {mac} nicht gefunden.")
+        return displays
+
+    def run(self):
+        """
+        Connect to the coordinator and process its messages until shutdown.
+        """
+        connection = Client(self.address, authkey=self.authkey)
+        connection.send(('hello', self.name))
+        pending = None
+
+        while True:
+            message = pending if pending is not None else connection.recv()
+            pending = None
+            kind = message[0]
+
+            if kind == 'ping':
+                connection.send(('pong', time.time()))
+            elif kind == 'assign':
+                self.displays = self._create_displays(message[1])
+                self.tower_map.check_led_counts({mac: display.num_leds for mac, display in self.displays.items()})
+                self.led_map = self.tower_map.subset(list(self.displays))
+                self.frame = None
+                self._control_displays('turn_on', "Einschalten")
+                connection.send(('ready',))
+            elif kind == 'effect':
+                _, effect_name, effect_args = message
+                effect = getattr(spatial_effects, effect_name)
+                self.effect = lambda led_map, t: effect(led_map, t, **effect_args)
+                self._reset_stats()
+            elif kind == 'frame' and self.effect is not None:
+                # Skip frames that are overdue when a newer one is already waiting
+                while time.time() > message[3] and connection.poll():
+                    next_message = connection.recv()
+                    if next_message[0] != 'frame':
+                        pending = next_message
+                        break
+                    self.stats['dropped_frames'] += 1
+                    message = next_message
+                self._show_frame(*message[1:])
+            elif kind == 'stop':
+                connection.send(('stats', self.stats))
+            elif kind == 'shutdown':
+                self._control_displays('turn_off', "Ausschalten")
+                connection.close()
+                return
+
+    def _control_displays(self, method, action):
+        # Like LightStringManager.turn_on_all: concurrently, failures are reported, not raised
+        results = run_on_all({mac: getattr(display, method) for mac, display in self.displays.items()})
+        print_report(f"{self.name}: {action}", results)
+        return results
+
+    def _show_frame(self, index, t, show_time):
+        render_start = time.perf_counter()
+        self.frame = spatial_effects.render(self.effect, self.led_map, t, out=self.frame)
+        self.stats['render_time'] += time.perf_counter() - render_start
+
+        lateness = time.time() - show_time
+        if lateness > 0:
+            self.stats['late_frames'] += 1
+            self.stats['max_lateness'] = max(self.stats['max_lateness'], lateness)
+        else:
+            time.sleep(-lateness)
+
+        for mac, display in self.displays.items():
+            buffer = self.frame_pool.get(mac, display.num_leds)
+            buffer.back.array[:] = self.frame[self.led_map.slices[mac]]
+            display.send_rt_frame(buffer.back)
+            buffer.swap()
+        self.stats['frames'] += 1
+
+
+def _run_worker(name, address, authkey, emulate):
+    Worker(name, address, authkey, emulate).run()
+
+
+def run_local(num_workers, effect_name, duration=10, fps=30, emulate=True, connect_timeout=30, **effect_args):
+    """
+    Run an effect with a coordinator and worker processes on this host.
+
+    :param num_workers: Number of worker processes.
+    :param effect_name: Name of the effect function in spatial_effects.
+    :param duration: Total duration of the effect in seconds.
+    :param fps: Frames per second.
+    :param emulate: If True, the workers use emulated devices.
+    :param connect_timeout: Time in seconds to wait for the workers to connect.
+    :param effect_args: Keyword arguments for the effect function.
+    :return: Dict mapping each worker name to its statistics.
+    """
+    coordinator = Coordinator(address=('127.0.0.1', 0))
+    processes = [
+        multiprocessing.Process(target=_run_worker,
+                                args=(f"worker-{i + 1}", coordinator.address, DEFAULT_AUTHKEY, emulate))
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        coordinator.accept_workers(num_workers, timeout=connect_timeout, processes=processes)
+        stats = coordinator.run_effect(effect_name, duration=duration, fps=fps, **effect_args)
+    finally:
+        coordinator.shutdown()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    failed = [process.name for process in processes if process.exitcode]
+    if failed:
+        raise RuntimeError(f"Worker processes failed: {', '.join(failed)}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verteiltes Rendern der Lichterketten.")
+    parser.add_argument('role', choices=['coordinator', 'worker', 'local'])
+    parser.add_argument('--host', default=DEFAULT_ADDRESS[0])
+    parser.add_argument('--port', type=int, default=DEFAULT_ADDRESS[1])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--name', default='worker')
+    parser.add_argument('--effect', choices=spatial_effects.EFFECTS, default='vertical_sweep')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--emulate', action='store_true', help="Emulierte Geräte statt echter Lichterketten")
+    args = parser.parse_args()
+    address = (args.host, args.port)
+
+    if args.role == 'worker':
+        Worker(args.name, address, emulate=args.emulate).run()
+        return
+
+    if args.role == 'local':
+        stats = run_local(args.workers, args.effect, args.duration, args.fps, emulate=args.emulate)
+    else:
+        coordinator = Coordinator(address=address)
+        try:
+            coordinator.accept_workers(args.workers)
+            stats = coordinator.run_effect(args.effect, duration=args.duration, fps=args.fps)
+        finally:
+            coordinator.shutdown()
+
+    for name, worker_stats in stats.items():
+        print(f"{name}: {worker_stats}")
+
+
+if __name__ == "__main__":
+    main()
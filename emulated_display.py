@@ -0,0 +1,47 @@
+import led_display_utils as ldu
+
+
+class EmulatedDisplay:
+    def __init__(self, mac_address, num_leds, output=None):
+        """
+        Stand-in for LEDDisplay that needs no device on the network.
+
+        Frames go through the same encoding as for a real device and are then
+        counted and optionally written to a file, so effects can be run and
+        measured without any light strings.
+
+        :param mac_address: MAC address of the emulated device.
+        :param num_leds: Number of LEDs of the emulated device.
+        :param output: Optional binary file object receiving the raw WRGB frames.
+        """
+        self.mac_address = mac_address
+        self.host = f"emulated-{mac_address}"
+        self.num_leds = num_leds
+        self.output = output
+        self.is_on = False
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def turn_on(self):
+        self.is_on = True
+
+    def turn_off(self):
+        self.is_on = False
+
+    def send_rt_frame(self, colors):
+        """
+        Send a real-time frame to the emulated device.
+
+        :param colors: The list of colors (WRGB tuples) for each LED, or a uint8 array.
+        """
+        ldu.send_rt_frame(self, colors)
+
+    def set_rt_frame_socket(self, frame, version, leds_number=None):
+        """
+        Receive an encoded frame, mirroring xled.ControlInterface.set_rt_frame_socket.
+        """
+        data = frame.getbuffer()
+        self.frames_sent += 1
+        self.bytes_sent += len(data)
+        if self.output is not None:
+            self.output.write(data)
@@ -1,6 +1,8 @@
 import xled
 import time
 import led_device_utils as ldu
+from config import CONTROL_TIMEOUT, CONTROL_RETRIES
+from device_control import run_on_all, print_report, set_request_timeout
 
 ###################
 # Dict of devices #
@@ -45,14 +47,28 @@ ctrl = {}
 for key, value in devices.items():
     h_ctrl[key] = xled.HighControlInterface(value["ip"], value["mac"])
     ctrl[key] = xled.ControlInterface(value["ip"], value["mac"])
+    set_request_timeout(h_ctrl[key], CONTROL_TIMEOUT)
+    set_request_timeout(ctrl[key], CONTROL_TIMEOUT)
 
 
-def reset():
-    for key, value in ctrl.items():
+def reset(timeout=CONTROL_TIMEOUT, retries=CONTROL_RETRIES):
+    """
+    Reset all devices concurrently: turn them off and on again and switch to colour mode.
+
+    :param timeout: Time in seconds to wait for each device.
+    :param retries: Number of retries for devices that failed or timed out.
+    :return: List of ControlResult, one per device.
+    """
+    def reset_device(key):
         h_ctrl[key].turn_off()
         h_ctrl[key].turn_on()
         ctrl[key].set_mode('color')
 
+    results = run_on_all({key: lambda key=key: reset_device(key) for key in ctrl},
+                         timeout=timeout, retries=retries)
+    print_report("Zurücksetzen", results)
+    return results
+
 # Convergence effect
 # Convergence effect that starts the light from the highest and lowest index lights simultaneously and runs it at such a speed that at the same time the light arrives at the mid-index light for each side of the mid-index so the lower ones and the upper ones only one light or star is turned on respectively and runs the trail effect once. The difficulty is to synchronize them such that they arrive at the same time at the mid-index light.
 def convergence(mid_index=400*5, duration=20):
@@ -0,0 +1,272 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MiB of prebuilt frames
+
+
+def freeze(value):
+    """
+    Convert function arguments into an immutable (hashable) structure.
+
+    Lists become tuples and dicts sorted tuples of items, recursively.
+
+    :param value: Any value (e.g. a pattern given as a list of strings).
+    :return: The same value with all lists replaced by tuples.
+    """
+    if isinstance(value, list):
+        value = tuple(value)
+    if isinstance(value, tuple):
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _is_frame(value):
+    # A frame is a sequence of colour tuples, a movie a sequence of frames
+    return not value or not isinstance(value[0], (list, tuple)) or not isinstance(value[0][0], (list, tuple))
+
+
+def freeze_frames(value):
+    """
+    Convert a frame or movie returned by a builder into tuples.
+
+    Colour tuples are immutable already and are kept as they are, so only the
+    frame (and movie) containers are copied. Frames that appear several times
+    in a movie stay shared.
+
+    :param value: A frame (list of WRGB tuples) or a movie (list of frames).
+    :return: The frame or movie as tuples.
+    """
+    if _is_frame(value):
+        return value if isinstance(value, tuple) else tuple(value)
+    frozen = {}
+    for frame in value:
+        if id(frame) not in frozen:
+            frozen[id(frame)] = frame if isinstance(frame, tuple) else tuple(frame)
+    return tuple(frozen[id(frame)] for frame in value)
+
+
+def estimate_size(value):
+    """
+    Estimate the memory footprint of a frame or movie in bytes.
+
+    Frame (and movie) containers and colour tuples are counted once each, so
+    frames and colours shared between LEDs and frames are not counted twice.
+    The colour components are small ints cached by Python and are left out.
+
+    :param value: A frozen frame or movie.
+    :return: Approximate size in bytes.
+    """
+    frames = {id(value): value} if _is_frame(value) else {id(frame): frame for frame in value}
+    colors = {}
+    for frame in frames.values():
+        colors.update(zip(map(id, frame), frame))
+    size = sum(sys.getsizeof(frame) for frame in frames.values())
+    size += sum(sys.getsizeof(color) for color in colors.values())
+    if not _is_frame(value):
+        size += sys.getsizeof(value)
+    return size
+
+
+class FrameCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=None):
+        """
+        In-memory LRU cache of immutable frames with byte-size based eviction,
+        optionally backed by a content-addressed cache on disk.
+
+        :param max_bytes: Maximum number of bytes kept in memory.
+        :param cache_dir: Directory for the on-disk cache (None disables it).
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.current_bytes = 0
+        self.hits = 0  # Values served from memory or disk
+        self.misses = 0  # Values built by calling the builder
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    def get(self, key):
+        """
+        Look up a value in memory.
+
+        :param key: The normalised function and arguments.
+        :return: The cached value, or None if not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        """
+        Store a value in memory, evicting the least recently used values if needed.
+
+        :param key: The normalised function and arguments.
+        :param value: The immutable frame or movie.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return  # Too large to keep, would evict everything else
+
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+
+        # Evict least recently used entries until we are within budget
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def clear(self):
+        """
+        Drop all in-memory entries. The on-disk cache is left untouched.
+        """
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.pickle')
+
+    def load_from_disk(self, key):
+        """
+        Load a value from the on-disk cache.
+
+        :param key: Content hash of the function and its arguments (see make_disk_key).
+        :return: The cached value, or None if not cached or the disk cache is disabled.
+        """
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        self.hits += 1
+        return value
+
+    def save_to_disk(self, key, value):
+        """
+        Store a value in the on-disk cache, if enabled.
+
+        :param key: Content hash of the function and its arguments (see make_disk_key).
+        :param value: The immutable frame or movie.
+        """
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a partial entry
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Frame-Cache konnte nicht geschrieben werden: {e}")
+
+
+cache = FrameCache()
+
+
+def configure(max_bytes=DEFAULT_MAX_BYTES, cache_dir=None):
+    """
+    Configure the global frame cache.
+
+    :param max_bytes: Maximum number of bytes kept in memory.
+    :param cache_dir: Directory for the on-disk cache (None disables it).
+    """
+    cache.max_bytes = max_bytes
+    cache.cache_dir = cache_dir
+    cache.clear()
+
+
+def _function_fingerprint(func):
+    """
+    Identify a function by its name and source code, so that changing a builder
+    invalidates its entries in the on-disk cache.
+
+    :return: Hex SHA-256 digest, computed once per decorated function.
+    """
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__code__.co_code.hex()
+    fingerprint = f"{func.__module__}.{func.__qualname__}\n{source}"
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+
+def make_disk_key(fingerprint, arguments):
+    """
+    Build a content-addressed key from a function fingerprint and its arguments.
+
+    :param fingerprint: Digest identifying the function.
+    :param arguments: Frozen, normalised arguments (see memoize_frames).
+    :return: Hex SHA-256 digest.
+    """
+    payload = f"{fingerprint}\n{arguments!r}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+MAX_ALIASES = 1024  # Remembered call signatures per function
+
+
+def memoize_frames(func):
+    """
+    Decorator memoizing a frame or movie builder in the global frame cache.
+
+    The result is frozen (lists become tuples) so it can safely be shared.
+    Arguments are normalised with the function signature, so positional and
+    keyword calls share one entry. Repeated calls are looked up by their
+    arguments directly, without normalising or hashing them again.
+    The original, uncached function is available as ``func.uncached``.
+    """
+    fingerprint = _function_fingerprint(func)
+    signature = inspect.signature(func)
+    aliases = {}  # Arguments as passed -> normalised cache key
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            call = (args, tuple(kwargs.items()))
+            key = aliases.get(call)
+        except TypeError:  # Unhashable arguments, e.g. a pattern given as list
+            call = (freeze(args), freeze(kwargs))
+            key = aliases.get(call)
+        if key is not None:
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = freeze(tuple(bound.arguments.items()))
+        key = (fingerprint, arguments)
+        if len(aliases) >= MAX_ALIASES:
+            aliases.clear()
+        aliases[call] = key
+
+        value = cache.get(key)
+        if value is None:
+            disk_key = make_disk_key(fingerprint, arguments) if cache.cache_dir else None
+            value = cache.load_from_disk(disk_key) if disk_key else None
+            if value is None:
+                cache.misses += 1
+                value = freeze_frames(func(*args, **kwargs))
+                cache.save_to_disk(disk_key, value)
+            cache.put(key, value)
+        return value
+
+    wrapper.uncached = func
+    return wrapper
@@ -0,0 +1,158 @@
+import io
+import tracemalloc
+
+BYTES_PER_LED = 4  # W, R, G, B
+
+
+class FrameBuffer:
+    def __init__(self, num_leds):
+        """
+        Preallocated, encoded WRGB frame that can be filled and sent without allocating.
+
+        The bytes live inside a BytesIO, so the buffer can be handed to
+        xled.ControlInterface.set_rt_frame_socket directly after rewinding it.
+
+        :param num_leds: Number of LEDs of the frame.
+        """
+        self.num_leds = num_leds
+        self.stream = io.BytesIO(bytes(num_leds * BYTES_PER_LED))
+        self.view = self.stream.getbuffer()  # Writable view of the stream's bytes
+        self._array = None
+
+        # Copy steps used by fill(): each step doubles the filled part of the buffer.
+        # The views are created once here so filling does not create new objects.
+        self._fill_steps = []
+        filled = BYTES_PER_LED
+        while filled < len(self.view):
+            size = min(filled, len(self.view) - filled)
+            self._fill_steps.append((self.view[filled:filled + size], self.view[:size]))
+            filled += size
+
+    def __len__(self):
+        return self.num_leds
+
+    @classmethod
+    def from_colors(cls, colors):
+        """
+        Create a buffer holding the given frame.
+
+        :param colors: The list of colors (WRGB tuples) for each LED.
+        :return: A new FrameBuffer.
+        """
+        buffer = cls(len(colors))
+        for index, color in enumerate(colors):
+            buffer.set(index, color)
+        return buffer
+
+    def set(self, index, color):
+        """
+        Set the colour of a single LED.
+
+        :param index: Index of the LED.
+        :param color: WRGB tuple.
+        """
+        offset = index * BYTES_PER_LED
+        view = self.view
+        view[offset] = color[0]
+        view[offset + 1] = color[1]
+        view[offset + 2] = color[2]
+        view[offset + 3] = color[3]
+
+    def fill(self, color):
+        """
+        Set all LEDs to the same colour.
+
+        :param color: WRGB tuple.
+        """
+        if not self.num_leds:
+            return
+        self.set(0, color)
+        for target, source in self._fill_steps:
+            target[:] = source
+
+    @property
+    def array(self):
+        """
+        NumPy view (number of LEDs, 4) of the buffer, e.g. as `out` for spatial_effects.render.
+        """
+        if self._array is None:
+            import numpy as np
+            self._array = np.frombuffer(self.view, dtype=np.uint8).reshape(self.num_leds, BYTES_PER_LED)
+        return self._array
+
+    def rewind(self):
+        """
+        Rewind the stream so the whole frame is read by the next send.
+
+        :return: The stream holding the frame.
+        """
+        self.stream.seek(0)
+        return self.stream
+
+
+class DoubleBuffer:
+    def __init__(self, num_leds):
+        """
+        Pair of frame buffers: effects render into `back`, `front` holds the frame
+        currently shown. After a frame has been sent, swap() exchanges both.
+
+        :param num_leds: Number of LEDs of the frames.
+        """
+        self.front = FrameBuffer(num_leds)
+        self.back = FrameBuffer(num_leds)
+
+    def swap(self):
+        """
+        Make the back buffer the shown frame and reuse the old front buffer for rendering.
+        """
+        self.front, self.back = self.back, self.front
+
+
+class FramePool:
+    def __init__(self):
+        """
+        Double buffers for several devices, created on first use and reused afterwards.
+        """
+        self.buffers = {}
+
+    def get(self, key, num_leds):
+        """
+        Return the double buffer for a device.
+
+        :param key: Identifier of the device (e.g. its MAC address).
+        :param num_leds: Number of LEDs of the device.
+        :return: DoubleBuffer for the device.
+        """
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.back.num_leds != num_leds:
+            buffer = DoubleBuffer(num_leds)
+            self.buffers[key] = buffer
+        return buffer
+
+
+def measure_allocations(step, frames=300, warmup=30):
+    """
+    Measure the memory allocated by a render/send step in steady state using tracemalloc.
+
+    :param step: Function without arguments rendering and sending one frame.
+    :param frames: Number of measured frames.
+    :param warmup: Number of frames run before measuring, e.g. to fill buffer pools.
+    :return: Tuple (retained bytes, peak bytes) allocated while running the measured
+             frames. Both are close to 0 for an allocation-free step.
+    """
+    for _ in range(warmup):
+        step()
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        for _ in range(frames):
+            step()
+        end, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return end - start, peak - start
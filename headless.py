@@ -0,0 +1,256 @@
+"""
+Render effects without any light strings and report their cost.
+
+Frames go through the same encoding as for real devices and end in a null sink
+or a raw frame file (WRGB bytes, device after device, frame after frame).
+
+Examples:
+    python -m headless converging --devices 7 --leds 400 --fps 30 --duration 10
+    python -m headless generate_moving_led_movie_wrgb_trail --output frames.raw
+    python -m headless --list
+"""
+import argparse
+import inspect
+import time
+import tracemalloc
+
+import led_display_utils as ldu
+import tracing
+from emulated_display import EmulatedDisplay
+from frame_pool import FrameBuffer
+from light_string_manager import LightStringManager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+SPATIAL_EFFECTS = ['vertical_sweep', 'rotating_bands', 'radial_convergence']
+MOVIE_GENERATORS = [name for name, function in inspect.getmembers(ldu, inspect.isfunction)
+                    if name.startswith('generate_')]
+# Movies along the light string, all other generators create a grid of grid_width columns
+STRIP_MOVIES = ['generate_movie_alternating_color', 'generate_moving_led_movie_wrgb',
+                'generate_moving_led_movie_wrgb_trail']
+GRID_MOVIES = [name for name in MOVIE_GENERATORS if name not in STRIP_MOVIES]
+EFFECTS = ['converging'] + SPATIAL_EFFECTS + MOVIE_GENERATORS
+
+
+def create_light_strings(num_devices, num_leds, output=None):
+    """
+    Create emulated light strings.
+
+    :param num_devices: Number of light strings.
+    :param num_leds: Number of LEDs per light string.
+    :param output: Optional binary file object receiving the raw frames.
+    :return: List of light strings as used by LightStringManager.
+    """
+    light_strings = []
+    for i in range(num_devices):
+        mac_address = f"00:00:00:00:{i // 256:02x}:{i % 256:02x}"
+        light_strings.append({
+            'position': i + 1,
+            'mac_address': mac_address,
+            'led_display': EmulatedDisplay(mac_address, num_leds, output),
+        })
+    return light_strings
+
+
+def build_movie(name, num_leds, num_frames, grid_width):
+    """
+    Build a movie with one of the generate_* functions of led_display_utils.
+
+    :param name: Name of the generator.
+    :param num_leds: Number of LEDs per light string.
+    :param num_frames: Number of frames for generators with a variable length.
+    :param grid_width: Width of the grid for grid based generators.
+    :return: List of frames.
+    :raises ValueError: For grid based generators if num_leds is not a multiple of grid_width.
+    """
+    red = (255, 0, 0)
+    if name == 'generate_movie_alternating_color':
+        return ldu.generate_movie_alternating_color(num_leds, num_frames, (0, 255, 0, 0), (1, 255, 255, 255))
+    if name == 'generate_moving_led_movie_wrgb':
+        return ldu.generate_moving_led_movie_wrgb(num_leds, red)
+    if name == 'generate_moving_led_movie_wrgb_trail':
+        return ldu.generate_moving_led_movie_wrgb_trail(num_leds, red)
+
+    if num_leds % grid_width:
+        raise ValueError(f"{name} needs a multiple of the grid width ({grid_width}) as number of LEDs, "
+                         f"got {num_leds}")
+    grid_height = num_leds // grid_width
+    if name == 'generate_precipitation_movie':
+        return ldu.generate_precipitation_movie(grid_width, grid_height, (0, 0, 255, 255),
+                                                num_frames=num_frames, density=0.1)
+    # Grid movies (e.g. generate_inward_moving_pattern_zigzag)
+    return getattr(ldu, name)(grid_width, grid_height)
+
+
+def encode_movie(movie):
+    """
+    Encode the frames of a movie once, like ldu.play_movie does.
+
+    Generators return the same frame object for repeated frames, such frames share one buffer.
+
+    :param movie: List of frames.
+    :return: List of FrameBuffer, one per frame.
+    """
+    encoded = {}
+    for frame in movie:
+        if id(frame) not in encoded:
+            encoded[id(frame)] = FrameBuffer.from_colors(frame)
+    return [encoded[id(frame)] for frame in movie]
+
+
+def play_movie_headless(light_strings, buffers, num_frames, fps, realtime):
+    """
+    Send the encoded frames of a movie to all light strings, like ldu.play_movie does for one device.
+    """
+    tracer = tracing.get_tracer()
+    start_time = time.perf_counter()
+    for step in range(num_frames):
+        with tracer.frame():
+            buffer = buffers[step % len(buffers)]
+            for light in light_strings:
+                light['led_display'].send_rt_frame(buffer)
+            if realtime:
+                time.sleep(max(0.0, start_time + (step + 1) / fps - time.perf_counter()))
+
+
+def run(effect, num_devices, num_leds, fps, duration, realtime=False, output=None, grid_width=20):
+    """
+    Run an effect on emulated light strings.
+
+    :param effect: Name of the effect (see EFFECTS).
+    :param num_devices: Number of light strings.
+    :param num_leds: Number of LEDs per light string.
+    :param fps: Frames per second.
+    :param duration: Duration of the effect in seconds.
+    :param realtime: If True, frames are paced at fps, otherwise sent as fast as possible.
+    :param output: Optional binary file object receiving the raw frames.
+    :param grid_width: Width of the grid for grid based movies.
+    :return: Dict with the measured values. Times and frames per second cover the
+             playback only, building and encoding a movie is given as build_time
+             and build_cpu_time.
+    """
+    light_strings = create_light_strings(num_devices, num_leds, output)
+    manager = LightStringManager(light_strings=light_strings)
+    num_frames = int(duration * fps)
+
+    if effect in SPATIAL_EFFECTS:
+        import spatial_effects  # Imported here so NumPy is only needed for spatial effects
+        led_map = spatial_effects.LEDMap.from_helix(light_strings, num_leds)
+
+    # Building and encoding a movie happens once and is reported separately from playback
+    build_time = build_cpu_time = 0.0
+    if effect not in SPATIAL_EFFECTS and effect != 'converging':
+        build_start, build_cpu_start = time.perf_counter(), time.process_time()
+        buffers = encode_movie(build_movie(effect, num_leds, num_frames, grid_width))
+        build_time = time.perf_counter() - build_start
+        build_cpu_time = time.process_time() - build_cpu_start
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    if effect == 'converging':
+        manager.run_converging_effect(target_index=num_devices // 2, duration=duration, fps=fps,
+                                      realtime=realtime)
+    elif effect in SPATIAL_EFFECTS:
+        manager.run_spatial_effect(getattr(spatial_effects, effect), led_map, duration=duration, fps=fps,
+                                   realtime=realtime)
+    else:
+        play_movie_headless(light_strings, buffers, num_frames, fps, realtime)
+
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+    displays = [light['led_display'] for light in light_strings]
+    return {
+        'frames': num_frames,
+        'device_frames': sum(display.frames_sent for display in displays),
+        'bytes': sum(display.bytes_sent for display in displays),
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'build_time': build_time,
+        'build_cpu_time': build_cpu_time,
+        'fps': num_frames / wall_time if wall_time else float('inf'),
+    }
+
+
+def _positive(value_type):
+    # argparse type accepting only values greater than 0
+    def parse(text):
+        value = value_type(text)
+        if value <= 0:
+            raise argparse.ArgumentTypeError(f"muss größer als 0 sein: {text}")
+        return value
+    return parse
+
+
+def peak_rss_mib():
+    """
+    Peak resident memory of the process in MiB, or None if not available.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux reports KiB
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Effekte ohne Lichterketten rendern und den Aufwand messen.")
+    parser.add_argument('effect', nargs='?', choices=EFFECTS, default='converging')
+    parser.add_argument('--list', action='store_true', help="Verfügbare Effekte anzeigen")
+    parser.add_argument('--devices', type=_positive(int), default=7, help="Anzahl Lichterketten")
+    parser.add_argument('--leds', type=_positive(int), default=400, help="LEDs pro Lichterkette")
+    parser.add_argument('--fps', type=_positive(float), default=30)
+    parser.add_argument('--duration', type=_positive(float), default=10, help="Dauer in Sekunden")
+    parser.add_argument('--realtime', action='store_true', help="Frames im Takt von --fps senden")
+    parser.add_argument('--output', help="Rohe WRGB-Frames in diese Datei schreiben")
+    parser.add_argument('--grid-width', type=_positive(int), default=20, help="Breite für Raster-Effekte")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Python-Speicherspitze mit tracemalloc messen (langsamer)")
+    parser.add_argument('--trace', help="Chrome-Trace in diese Datei schreiben")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(EFFECTS))
+        return
+
+    if args.effect in GRID_MOVIES and args.leds % args.grid_width:
+        parser.error(f"--leds ({args.leds}) muss für Raster-Effekte ein Vielfaches von "
+                     f"--grid-width ({args.grid_width}) sein")
+
+    if args.trace:
+        tracing.enable(args.trace)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    output = open(args.output, 'wb') if args.output else None
+    try:
+        stats = run(args.effect, args.devices, args.leds, args.fps, args.duration,
+                    realtime=args.realtime, output=output, grid_width=args.grid_width)
+    finally:
+        if output is not None:
+            output.close()
+
+    print(f"Effekt:          {args.effect} ({args.devices} x {args.leds} LEDs)")
+    print(f"Frames:          {stats['frames']} ({stats['device_frames']} an Geräte, "
+          f"{stats['bytes'] / 1024 / 1024:.1f} MiB)")
+    print(f"Zeit:            {stats['wall_time']:.3f} s")
+    print(f"Frames/s:        {stats['fps']:.1f} (Ziel {args.fps:g})")
+    print(f"CPU-Zeit:        {stats['cpu_time']:.3f} s "
+          f"({stats['cpu_time'] / max(stats['frames'], 1) * 1000:.3f} ms pro Frame)")
+    if args.effect in MOVIE_GENERATORS:
+        print(f"Aufbau:          {stats['build_time']:.3f} s (CPU-Zeit {stats['build_cpu_time']:.3f} s, "
+              f"einmalig vor der Wiedergabe)")
+    rss = peak_rss_mib()
+    if rss is not None:
+        print(f"Speicher (RSS):  {rss:.1f} MiB Spitze")
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Python-Speicher: {peak / 1024 / 1024:.2f} MiB Spitze (tracemalloc)")
+
+    tracing.get_tracer().write()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,74 @@ import xled
 import time
 import io
 import random
+from config import CONTROL_TIMEOUT
+from device_control import set_request_timeout
+from frame_cache import memoize_frames
+from frame_pool import FrameBuffer
+from tracing import get_tracer
+
+class LEDDisplay:
+    def __init__(self, ip_address, mac_address, timeout=CONTROL_TIMEOUT):
+        """
+        A single Twinkly light string.
+
+        :param ip_address: IP address of the device.
+        :param mac_address: MAC address of the device.
+        :param timeout: Timeout in seconds for each HTTP request to the device.
+        """
+        self.ip_address = ip_address
+        self.mac_address = mac_address
+        self.high_control = xled.HighControlInterface(ip_address, mac_address)
+        self.control = xled.ControlInterface(ip_address, mac_address)
+        set_request_timeout(self.high_control, timeout)
+        set_request_timeout(self.control, timeout)
+        self.num_leds = self.control.get_device_info()['number_of_led']
+
+    def turn_on(self):
+        """
+        Turn on the light string and switch it to real-time mode.
+        """
+        self.high_control.turn_on()
+        self.control.set_mode('rt')
+
+    def turn_off(self):
+        """
+        Turn off the light string.
+        """
+        self.high_control.turn_off()
+
+    def send_rt_frame(self, colors):
+        """
+        Send a real-time frame to the light string.
+
+        :param colors: The list of colors (WRGB tuples) for each LED, or a frame buffer.
+        """
+        send_rt_frame(self.control, colors)
 
 def send_rt_frame(control, colors):
     """
     Send a real-time frame to the LED device.
 
     :param control: The ControlInterface object.
-    :param colors: The list of colors (WRGB tuples) for each LED.
+    :param colors: The list of colors (WRGB tuples) for each LED, a uint8 array
+                   with one WRGB row per LED (e.g. from spatial_effects.render)
+                   or a frame_pool.FrameBuffer.
     """
-    frame_data = bytearray()
-    for color in colors:
-        frame_data.extend(bytearray(color))
+    tracer = get_tracer()
+    with tracer.span('encode', leds=len(colors)):
+        if isinstance(colors, FrameBuffer):
+            frame = colors.rewind()  # Already encoded, sent without copying
+        else:
+            if hasattr(colors, 'tobytes'):
+                frame_data = colors.tobytes()  # Already encoded as WRGB bytes
+            else:
+                frame_data = bytearray()
+                for color in colors:
+                    frame_data.extend(bytearray(color))
 
-    frame = io.BytesIO(frame_data)
-    control.set_rt_frame_socket(frame, version=3, leds_number=len(colors))
+            frame = io.BytesIO(frame_data)
+    with tracer.span('send', host=getattr(control, 'host', None)):
+        control.set_rt_frame_socket(frame, version=3, leds_number=len(colors))
 
 def play_movie(control, movie, frame_delay, loop=True):
     """
@@ -28,11 +82,22 @@ def play_movie(control, movie, frame_delay, loop=True):
                  If an integer, play the movie that many times.
     """
     loop_count = 0
+    tracer = get_tracer()
+
+    # Encode every distinct frame once, so playing the movie does not allocate
+    encoded = {}
+    buffers = []
+    for frame in movie:
+        if id(frame) not in encoded:
+            encoded[id(frame)] = FrameBuffer.from_colors(frame)
+        buffers.append(encoded[id(frame)])
 
     while True:
-        for frame in movie:
-                (control, frame)
-            time.sleep(frame_delay)
+        for buffer in buffers:
+            with tracer.frame():
+                send_rt_frame(control, buffer)
+                with tracer.span('sleep'):
+                    time.sleep(frame_delay)
 
         if isinstance(loop, bool):
             if not loop:
@@ -42,6 +107,7 @@ def play_movie(control, movie, frame_delay, loop=True):
             if loop_count >= loop:
                 break
 
+@memoize_frames
 def generate_movie_alternating_color(num_leds, num_frames, color1, color2):
 
     """
@@ -51,19 +117,14 @@ def generate_movie_alternating_color(num_leds, num_frames, color1, color2):
     :param num_frames: Number of frames in the movie.
     :param color1: First color as an WRGB tuple (e.g., (255, 0, 0) for red).
     :param color2: Second color as an WRGB tuple (e.g., (0, 255, 0) for green).
-    :return: List of frames, each frame is a list of WRGB tuples.
+    :return: Tuple of frames, each frame is a tuple of WRGB tuples.
     """
-    movie = []
-    for frame_index in range(num_frames):
-        frame = []
-        for led_index in range(num_leds):
-            if frame_index % 2 == 0:
-                frame.append(color1 if led_index % 2 == 0 else color2)
-            else:
-                frame.append(color2 if led_index % 2 == 0 else color1)
-        movie.append(frame)
-    return movie
+    # Only two distinct frames exist, build them once and reference them
+    even_frame = create_alternating_color_pattern(num_leds, color1, color2)
+    odd_frame = create_alternating_color_pattern(num_leds, color2, color1)
+    return [even_frame if frame_index % 2 == 0 else odd_frame for frame_index in range(num_frames)]
 
+@memoize_frames
 def generate_moving_led_movie_wrgb(num_leds, color, white_value=0):
     """
     Generate a movie where a single LED moves from the first to the last position
@@ -73,7 +134,7 @@ def generate_moving_led_movie_wrgb(num_leds, color, white_value=0):
     :param color: Color of the moving LED as an RGB tuple (e.g., (255, 0, 0) for red).
     :param white_value: White value (0 to 255). 0 = full color, 1 = white only,
                         255 = white mixed with color.
-    :return: List of frames, each frame is a list of WRGB tuples.
+    :return: Tuple of frames, each frame is a tuple of WRGB tuples.
     """
     off_color = (0, 0, 0, 0)  # Color representing the turned-off state (WRGB)
     on_color = (white_value,) + color  # Active LED color with white component (WRGB)
@@ -86,6 +147,7 @@ def generate_moving_led_movie_wrgb(num_leds, color, white_value=0):
 
     return movie
 
+@memoize_frames
 def generate_moving_led_movie_wrgb_trail(num_leds, color, trail_length=49):
     """
     Generate a movie where a single LED moves from the first to the last position
@@ -95,7 +157,7 @@ def generate_moving_led_movie_wrgb_trail(num_leds, color, trail_length=49):
     :param num_leds: Number of LEDs in the strip.
     :param color: Color of the moving LED as an RGB tuple (e.g., (255, 0, 0) for red).
     :param trail_length: Length of the trail following the moving LED.
-    :return: List of frames, each frame is a list of WRGB tuples.
+    :return: Tuple of frames, each frame is a tuple of WRGB tuples.
     """
     off_color = (0, 0, 0, 0)  # Color representing the turned-off state (WRGB)
 
@@ -121,6 +183,7 @@ def generate_moving_led_movie_wrgb_trail(num_leds, color, trail_length=49):
 
     return movie
 
+@memoize_frames
 def create_alternating_color_pattern(led_count, color1, color2):
     """
     Create an alternating color pattern for the given number of LEDs.
@@ -128,7 +191,7 @@ def create_alternating_color_pattern(led_count, color1, color2):
     :param led_count: The number of LEDs.
     :param color1: The first color (WRGB tuple).
     :param color2: The second color (WRGB tuple).
-    :return: List of colors for each LED.
+    :return: Tuple of colors for each LED.
     """
     colors = []
     for i in range(led_count):
@@ -138,19 +201,21 @@ def create_alternating_color_pattern(led_count, color1, color2):
             colors.append(color2)  # Odd-indexed LEDs
     return colors
 
+@memoize_frames
 def create_color_pattern(led_count, pattern):
     """
     Create a color pattern for the given number of LEDs.
 
     :param led_count: The number of LEDs.
     :param pattern: The color pattern (list of WRGB tuples).
-    :return: List of colors for each LED.
+    :return: Tuple of colors for each LED.
     """
     colors = []
     for i in range(led_count):
         colors.append(pattern[i % len(pattern)])
     return colors
 
+@memoize_frames
 def convert_pattern_to_frame(frame, on_color=(1, 255, 255, 255), off_color=(0, 0, 0, 0)):
     """
     Convert a frame into LED data.
@@ -158,7 +223,7 @@ def convert_pattern_to_frame(frame, on_color=(1, 255, 255, 255), off_color=(0, 0
     :param frame: List of strings representing the frame.
     :param on_color: RGB tuple representing the color when the LED is on.
     :param off_color: RGB tuple representing the color when the LED is off.
-    :return: List of RGB tuples representing the LED data for the frame.
+    :return: Tuple of RGB tuples representing the LED data for the frame.
     """
     led_data = []
     for row in frame:
@@ -169,6 +234,7 @@ def convert_pattern_to_frame(frame, on_color=(1, 255, 255, 255), off_color=(0, 0
                 led_data.append(off_color)  # LED is off
     return led_data
 
+@memoize_frames
 def generate_inward_moving_pattern_zigzag(grid_width, grid_height, on_color=(0, 255, 255, 255), off_color=(0, 0, 0, 0)):
     """
     Generate a movie where the lit pattern moves inward on a zigzag-wired grid using WRGB.
@@ -177,7 +243,7 @@ def generate_inward_moving_pattern_zigzag(grid_width, grid_height, on_color=(0,
     :param grid_height: Height of the grid.
     :param on_color: WRGB tuple for the 'on' state (e.g., (0, 255, 255, 255) for full color).
     :param off_color: WRGB tuple for the 'off' state (e.g., (0, 0, 0, 0) for off).
-    :return: List of frames, each frame is a list of WRGB tuples.
+    :return: Tuple of frames, each frame is a tuple of WRGB tuples.
     """
 
     def create_zigzag_row(row_num, inner_border):
@@ -203,6 +269,7 @@ def generate_inward_moving_pattern_zigzag(grid_width, grid_height, on_color=(0,
 
     return frames
 
+@memoize_frames
 def generate_outward_moving_pattern_zigzag(grid_width, grid_height, on_color=(0, 255, 255, 255), off_color=(0, 0, 0, 0)):
     """
     Generate a movie where the lit pattern moves outward on a zigzag-wired grid using WRGB.
@@ -211,7 +278,7 @@ def generate_outward_moving_pattern_zigzag(grid_width, grid_height, on_color=(0,
     :param grid_height: Height of the grid.
     :param on_color: WRGB tuple for the 'on' state.
     :param off_color: WRGB tuple for the 'off' state.
-    :return: List of frames, each frame is a list of WRGB tuples.
+    :return: Tuple of frames, each frame is a tuple of WRGB tuples.
     """
 
     def create_zigzag_row(row_num, inner_border):
@@ -1,17 +1,27 @@
-from config import LIGHT_STRINGS
+from config import LIGHT_STRINGS, CONTROL_TIMEOUT, CONTROL_RETRIES
+from device_control import run_on_all, print_report
 from led_display_utils import LEDDisplay
+from frame_pool import FramePool
 import time
 from xled.discover import xdiscover
+from tracing import get_tracer
 
 class LightStringManager:
-    def __init__(self, discovery_timeout=3):
+    def __init__(self, discovery_timeout=3, light_strings=None):
         """
         Initialize the LightStringManager by creating LEDDisplay instances for each light string.
         :param discovery_timeout: Time in seconds to wait for device discovery (default 10 seconds).
+        :param light_strings: Optional list of light strings (dicts with 'position', 'mac_address'
+                              and 'led_display') to use instead of discovering the devices,
+                              e.g. with emulated displays.
         """
         self.light_strings = []
         self.discovery_timeout = discovery_timeout
-        self.initialize_light_strings()
+        self.frame_pool = FramePool()
+        if light_strings is None:
+            self.initialize_light_strings()
+        else:
+            self.light_strings = sorted(light_strings, key=lambda x: x['position'])
 
     def initialize_light_strings(self):
         """
@@ -24,24 +34,25 @@ class LightStringManager:
 
         print("Starte Geräteentdeckung...")
 
-        while time.time() - start_time < self.discovery_timeout:
-            try:
-                # Start discovery
-                for response in xdiscover():
-                    device = {
-                        'ip_address': response.ip_address,
-                        'mac_address': response.hw_address.lower(),  # Ensure MAC address is in lowercase
-                    }
-                    # Avoid duplicates
-                    if device not in discovered_devices:
-                        discovered_devices.append(device)
-                        print(f"Gerät gefunden: {response.hw_address} ({response.ip_address})")
-            except Exception as e:
-                if str(e) == "Unknown event":
-                    pass  # Ignore the exception and continue
-                else:
-                    print(f"Fehler bei der Geräteentdeckung: {e}")
-            # time.sleep(0.5)  # Wait before next discovery attempt
+        with get_tracer().span('discovery', timeout=self.discovery_timeout):
+            while time.time() - start_time < self.discovery_timeout:
+                try:
+                    # Start discovery
+                    for response in xdiscover():
+                        device = {
+                            'ip_address': response.ip_address,
+                            'mac_address': response.hw_address.lower(),  # Ensure MAC address is in lowercase
+                        }
+                        # Avoid duplicates
+                        if device not in discovered_devices:
+                            discovered_devices.append(device)
+                            print(f"Gerät gefunden: {response.hw_address} ({response.ip_address})")
+                except Exception as e:
+                    if str(e) == "Unknown event":
+                        pass  # Ignore the exception and continue
+                    else:
+                        print(f"Fehler bei der Geräteentdeckung: {e}")
+                # time.sleep(0.5)  # Wait before next discovery attempt
 
         if not discovered_devices:
             print("Keine Geräte gefunden.")
@@ -68,19 +79,35 @@ class LightStringManager:
         # Sort light strings based on position
         self.light_strings.sort(key=lambda x: x['position'])
 
-    def turn_on_all(self):
+    def turn_on_all(self, timeout=CONTROL_TIMEOUT, retries=CONTROL_RETRIES):
         """
-        Turn on all managed LED light strings.
+        Turn on all managed LED light strings concurrently.
+
+        :param timeout: Time in seconds to wait for each device.
+        :param retries: Number of retries for devices that failed or timed out.
+        :return: List of ControlResult, one per light string.
         """
-        for light in self.light_strings:
-            light['led_display'].turn_on()
+        with get_tracer().span('turn_on_all'):
+            results = run_on_all(
+                {light['mac_address']: light['led_display'].turn_on for light in self.light_strings},
+                timeout=timeout, retries=retries)
+        print_report("Einschalten", results)
+        return results
 
-    def turn_off_all(self):
+    def turn_off_all(self, timeout=CONTROL_TIMEOUT, retries=CONTROL_RETRIES):
         """
-        Turn off all managed LED light strings.
+        Turn off all managed LED light strings concurrently.
+
+        :param timeout: Time in seconds to wait for each device.
+        :param retries: Number of retries for devices that failed or timed out.
+        :return: List of ControlResult, one per light string.
         """
-        for light in self.light_strings:
-            light['led_display'].turn_off()
+        with get_tracer().span('turn_off_all'):
+            results = run_on_all(
+                {light['mac_address']: light['led_display'].turn_off for light in self.light_strings},
+                timeout=timeout, retries=retries)
+        print_report("Ausschalten", results)
+        return results
 
     def send_frame_to_all(self, colors):
         """
@@ -88,10 +115,12 @@ class LightStringManager:
 
         :param colors: The list of colors (WRGB tuples) for each LED.
         """
+        tracer = get_tracer()
         for light in self.light_strings:
-            light['led_display'].send_rt_frame(colors)
+            with tracer.span('send_device', device=light['mac_address']):
+                light['led_display'].send_rt_frame(colors)
 
-    def run_converging_effect(self, target_index, base_brightness=0.5, duration=10, fps=30):
+    def run_converging_effect(self, target_index, base_brightness=0.5, duration=10, fps=30, realtime=True):
         """
         Start a converging light effect where the light intensities move towards a target light string.
 
@@ -99,47 +128,62 @@ class LightStringManager:
         :param base_brightness: Base brightness level (between 0 and 1).
         :param duration: Total duration of the effect in seconds.
         :param fps: Frames per second.
+        :param realtime: If False, frames are sent as fast as possible (e.g. for benchmarks).
         """
         total_steps = int(duration * fps)
         num_devices = len(self.light_strings)
         left_indices = list(range(0, target_index))
         right_indices = list(range(num_devices - 1, target_index, -1))
         brightness_levels = [base_brightness] * num_devices
+        buffers = [self.frame_pool.get(light['mac_address'], light['led_display'].num_leds)
+                   for light in self.light_strings]
+
+        tracer = get_tracer()
 
         for step in range(total_steps):
-            progress = step / total_steps
-
-            # Update brightness for left side
-            for i in left_indices:
-                if len(left_indices) == 0:
-                    relative_position = 0
-                else:
-                    relative_position = (target_index - i) / len(left_indices)
-                if progress >= relative_position:
-                    brightness_levels[i] = base_brightness + (1.0 - base_brightness) * (
-                        (progress - relative_position) / (1.0 - relative_position)
-                    )
-
-            # Update brightness for right side
-            for i in right_indices:
-                if len(right_indices) == 0:
-                    relative_position = 0
-                else:
-                    relative_position = (i - target_index) / len(right_indices)
-                if progress >= relative_position:
-                    brightness_levels[i] = base_brightness + (1.0 - base_brightness) * (
-                        (progress - relative_position) / (1.0 - relative_position)
-                    )
-
-            # Ensure target light string stays at full brightness
-            brightness_levels[target_index] = 1.0
-
-            # Send brightness levels to each light string
-            for i, light in enumerate(self.light_strings):
-                frame = self.create_brightness_frame(light['led_display'].num_leds, brightness_levels[i])
-                light['led_display'].send_rt_frame(frame)
-
-            time.sleep(1 / fps)
+            with tracer.frame():
+                progress = step / total_steps
+
+                with tracer.span('render'):
+                    # Update brightness for left side
+                    for i in left_indices:
+                        if len(left_indices) == 0:
+                            relative_position = 0
+                        else:
+                            relative_position = (target_index - i) / len(left_indices)
+                        if progress >= relative_position:
+                            brightness_levels[i] = base_brightness + (1.0 - base_brightness) * (
+                                (progress - relative_position) / (1.0 - relative_position)
+                            )
+
+                    # Update brightness for right side
+                    for i in right_indices:
+                        if len(right_indices) == 0:
+                            relative_position = 0
+                        else:
+                            relative_position = (i - target_index) / len(right_indices)
+                        if progress >= relative_position:
+                            brightness_levels[i] = base_brightness + (1.0 - base_brightness) * (
+                                (progress - relative_position) / (1.0 - relative_position)
+                            )
+
+                    # Ensure target light string stays at full brightness
+                    brightness_levels[target_index] = 1.0
+
+                    # Render into the back buffers, no new frames are allocated
+                    for i in range(num_devices):
+                        buffers[i].back.fill(self.brightness_color(brightness_levels[i]))
+
+                # Send brightness levels to each light string
+                for i in range(num_devices):
+                    light = self.light_strings[i]
+                    with tracer.span('send_device', device=light['mac_address']):
+                        light['led_display'].send_rt_frame(buffers[i].back)
+                    buffers[i].swap()
+
+                if realtime:
+                    with tracer.span('sleep'):
+                        time.sleep(1 / fps)
 
     def create_brightness_frame(self, num_leds, brightness):
         """
@@ -149,11 +193,128 @@ class LightStringManager:
         :param brightness: Brightness level between 0 and 1.
         :return: List of WRGB tuples representing the LED colors.
         """
-        color = (
+        frame = [self.brightness_color(brightness)] * num_leds
+        return frame
+
+    @staticmethod
+    def brightness_color(brightness):
+        """
+        Warm white colour with the specified brightness.
+
+        :param brightness: Brightness level between 0 and 1.
+        :return: WRGB tuple.
+        """
+        return (
             0,  # White component
             int(255 * brightness),  # Red
             int(223 * brightness),  # Green
             int(191 * brightness)   # Blue
         )
-        frame = [color] * num_leds
-        return frame
\ No newline at end of file
+
+    def run_spatial_effect(self, effect, led_map, duration=10, fps=30, realtime=True):
+        """
+        Run an effect from spatial_effects over all light strings.
+
+        The effect is evaluated once per frame for every LED of the installation,
+        each light string then receives its part of the rendered frame.
+
+        :param effect: Function f(led_map, t), e.g. spatial_effects.vertical_sweep.
+        :param led_map: The spatial_effects.LEDMap of the installation.
+        :param duration: Total duration of the effect in seconds.
+        :param fps: Frames per second.
+        :param realtime: If False, frames are sent as fast as possible (e.g. for benchmarks).
+        :raises ValueError: If the LED map does not match the number of LEDs of the devices.
+        """
+        from spatial_effects import render
+
+        led_map.check_led_counts({light['mac_address']: light['led_display'].num_leds
+                                  for light in self.light_strings})
+        tracer = get_tracer()
+        frame = None
+        buffers = [self.frame_pool.get(light['mac_address'], light['led_display'].num_leds)
+                   for light in self.light_strings]
+        start_time = time.perf_counter()
+
+        for step in range(int(duration * fps)):
+            with tracer.frame():
+                with tracer.span('render'):
+                    frame = render(effect, led_map, step / fps, out=frame)
+
+                for light, buffer in zip(self.light_strings, buffers):
+                    # Copy the device's part into its back buffer instead of encoding a new frame
+                    buffer.back.array[:] = frame[led_map.slices[light['mac_address']]]
+                    with tracer.span('send_device', device=light['mac_address']):
+                        light['led_display'].send_rt_frame(buffer.back)
+                    buffer.swap()
+
+                # Sleep until the next frame is due, so rendering time does not slow the effect down
+                if realtime:
+                    with tracer.span('sleep'):
+                        time.sleep(max(0.0, start_time + (step + 1) / fps - time.perf_counter()))
+
+    def run_audio_effect(self, stream, mode='spectrum', fps=30, num_bands=3, base_brightness=0.05):
+        """
+        Drive the light strings from live audio until the audio stream ends.
+
+        A frame is rendered as soon as a new audio block arrives and the previous
+        frame is at least one frame period old, so the audio-to-light latency stays
+        around one audio block plus rendering and sending. The levels are computed
+        from the whole analysis window, whose centre lags half a window behind.
+
+        :param stream: An audio_reactive.AudioStream (not yet started), closed at the end.
+        :param mode: 'spectrum' gives each light string the level of one frequency band,
+                     'brightness' sets the brightness of all strings from the bass level.
+        :param fps: Maximum frames per second.
+        :param num_bands: Number of frequency bands.
+        :param base_brightness: Brightness level used during silence (between 0 and 1).
+        :return: Latency report, see audio_reactive.latency_report.
+        """
+        from audio_reactive import BAND_COLORS, BandAnalyzer, latency_report
+
+        analyzer = BandAnalyzer(stream.sample_rate, window_size=stream.window_size, num_bands=num_bands)
+        samples = analyzer.samples
+        buffers = [self.frame_pool.get(light['mac_address'], light['led_display'].num_leds)
+                   for light in self.light_strings]
+        num_devices = len(self.light_strings)
+        band_of_device = [i * num_bands // max(num_devices, 1) for i in range(num_devices)]
+        tracer = get_tracer()
+        latencies = []
+        next_frame = time.perf_counter()
+
+        stream.start()
+        try:
+            while not stream.finished:
+                if not stream.wait_for_block():
+                    continue
+                now = time.perf_counter()
+                if now < next_frame:
+                    continue  # Too early, the next block will be used
+                next_frame = max(next_frame + 1 / fps, now)
+
+                with tracer.frame():
+                    arrival_time = stream.arrival_time
+                    with tracer.span('render'):
+                        levels = analyzer.analyze(stream.ring.latest(samples))
+                        for i in range(num_devices):
+                            if mode == 'brightness':
+                                level = base_brightness + (1.0 - base_brightness) * float(levels[0])
+                                buffers[i].back.fill(self.brightness_color(level))
+                            else:
+                                band = band_of_device[i]
+                                level = base_brightness + (1.0 - base_brightness) * float(levels[band])
+                                color = BAND_COLORS[band % len(BAND_COLORS)]
+                                buffers[i].back.fill(tuple(int(c * level) for c in color))
+
+                    for i in range(num_devices):
+                        light = self.light_strings[i]
+                        with tracer.span('send_device', device=light['mac_address']):
+                            light['led_display'].send_rt_frame(buffers[i].back)
+                        buffers[i].swap()
+
+                # From the newest block being read to all strings updated, the report adds
+                # the block duration and the delay of the analysis window
+                latencies.append(time.perf_counter() - arrival_time)
+        finally:
+            stream.close()
+
+        return latency_report(latencies, fps, stream.block_duration, stream.window_delay)
@@ -1,12 +1,20 @@
 # main.py
 
+from config import FRAME_CACHE_DIR, TRACE_FILE, TRACE_SAMPLE_RATE
+import frame_cache
 from light_string_manager import LightStringManager
+import tracing
 
 def main():
     """
     Hauptfunktion zur Initialisierung des LightStringManagers, Einschalten aller Lichter,
     Ausführen des Konvergenzeffekts und sauberen Beenden.
     """
+    if FRAME_CACHE_DIR:
+        frame_cache.configure(cache_dir=FRAME_CACHE_DIR)
+    if TRACE_FILE:
+        tracing.enable(TRACE_FILE, sample_rate=TRACE_SAMPLE_RATE)
+
     manager = LightStringManager()
     manager.turn_on_all()
 
@@ -23,7 +31,10 @@ def main():
         print(f"Ein Fehler ist aufgetreten: {e}")
     finally:
         print("Schalte alle Lichter aus.")
-        manager.turn_off_all()
+        try:
+            manager.turn_off_all()
+        finally:
+            tracing.get_tracer().write()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
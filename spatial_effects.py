@@ -0,0 +1,234 @@
+import math
+
+import numpy as np
+
+from config import (LIGHT_STRINGS, TOWER_MAP_FILE, TOWER_LEDS_PER_STRING,
+                    TOWER_RADIUS, TOWER_HEIGHT, TOWER_TURNS)
+
+
+class LEDMap:
+    def __init__(self, coordinates, light_strings, leds_per_string):
+        """
+        Physical (x, y, z) position of every LED of the light strings.
+
+        The LEDs of all strings are stored in one array, ordered by the string
+        position in the configuration, so effects can be evaluated for the whole
+        installation with a few array operations.
+
+        :param coordinates: Array of shape (number of LEDs, 3) with x, y, z per LED.
+        :param light_strings: Light string configuration (e.g. config.LIGHT_STRINGS).
+        :param leds_per_string: Number of LEDs per string, or a dict mapping MAC
+                                addresses to the number of LEDs of that string.
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float32)
+        if self.coordinates.ndim != 2 or self.coordinates.shape[1] != 3:
+            raise ValueError("coordinates must have the shape (number of LEDs, 3)")
+
+        # Slice of the coordinate table belonging to each string (by MAC address)
+        self.slices = {}
+        offset = 0
+        for light in sorted(light_strings, key=lambda x: x['position']):
+            mac_address = light['mac_address'].lower()
+            count = _led_count(leds_per_string, mac_address)
+            self.slices[mac_address] = slice(offset, offset + count)
+            offset += count
+        if offset != len(self.coordinates):
+            raise ValueError(f"{len(self.coordinates)} coordinates for {offset} LEDs")
+
+        # Extent of the whole installation, kept when taking a subset
+        self.z_min = float(self.coordinates[:, 2].min())
+        self.z_max = float(self.coordinates[:, 2].max())
+        self.max_radius = float(np.hypot(self.coordinates[:, 0], self.coordinates[:, 1]).max())
+        self._derive()
+
+    def _derive(self):
+        # Derived values used by most effects, computed once
+        self.x, self.y, self.z = self.coordinates.T
+        self.radius = np.hypot(self.x, self.y)
+        self.angle = np.arctan2(self.y, self.x)  # -pi..pi around the tower axis
+        self.height = (self.z - self.z_min) / max(self.z_max - self.z_min, 1e-6)  # 0 (bottom) .. 1 (top)
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def subset(self, mac_addresses):
+        """
+        Create a map containing only some of the light strings.
+
+        The extent of the whole installation is kept, so an effect rendered on a
+        subset matches the same LEDs rendered on the full map.
+
+        :param mac_addresses: MAC addresses of the light strings to keep.
+        :return: A new LEDMap with the strings in the order given.
+        """
+        subset = LEDMap.__new__(LEDMap)
+        subset.z_min, subset.z_max, subset.max_radius = self.z_min, self.z_max, self.max_radius
+        subset.slices = {}
+        parts = []
+        offset = 0
+        for mac_address in mac_addresses:
+            part = self.coordinates[self.slices[mac_address]]
+            subset.slices[mac_address] = slice(offset, offset + len(part))
+            parts.append(part)
+            offset += len(part)
+        subset.coordinates = np.concatenate(parts) if parts else np.empty((0, 3), dtype=np.float32)
+        subset._derive()
+        return subset
+
+    def check_led_counts(self, led_counts):
+        """
+        Check that the map has the same number of LEDs per string as the devices.
+
+        :param led_counts: Dict mapping MAC addresses to the number of LEDs of the device.
+        :raises ValueError: If a string is missing from the map or has a different number of LEDs.
+        """
+        for mac_address, count in led_counts.items():
+            if mac_address not in self.slices:
+                raise ValueError(f"Light string {mac_address} is not part of the LED map")
+            map_slice = self.slices[mac_address]
+            if map_slice.stop - map_slice.start != count:
+                raise ValueError(f"Light string {mac_address} has {count} LEDs, but the LED map has "
+                                 f"{map_slice.stop - map_slice.start} (see config.TOWER_LEDS_PER_STRING)")
+
+    @classmethod
+    def from_helix(cls, light_strings, leds_per_string, radius=1.0, height=10.0, turns=20):
+        """
+        Generate the coordinates from a helix model of the tower.
+
+        All strings are wound around the tower as one continuous helix, starting
+        at the bottom with the string at position 1.
+
+        :param light_strings: Light string configuration (e.g. config.LIGHT_STRINGS).
+        :param leds_per_string: Number of LEDs per string (int or dict by MAC address).
+        :param radius: Radius of the tower in metres.
+        :param height: Height covered by the helix in metres.
+        :param turns: Number of turns of the helix around the tower.
+        """
+        total = sum(_led_count(leds_per_string, light['mac_address'].lower()) for light in light_strings)
+        progress = np.linspace(0.0, 1.0, total, dtype=np.float32)
+        angle = 2 * math.pi * turns * progress
+        coordinates = np.stack([radius * np.cos(angle), radius * np.sin(angle), height * progress], axis=1)
+        return cls(coordinates, light_strings, leds_per_string)
+
+    @classmethod
+    def from_file(cls, path, light_strings, leds_per_string):
+        """
+        Load the coordinates from a file.
+
+        Supported are NumPy files (.npy) and text files with one 'x,y,z' line per
+        LED, ordered by string position and LED index.
+
+        :param path: Path of the coordinate file.
+        :param light_strings: Light string configuration (e.g. config.LIGHT_STRINGS).
+        :param leds_per_string: Number of LEDs per string (int or dict by MAC address).
+        """
+        if str(path).endswith('.npy'):
+            coordinates = np.load(path)
+        else:
+            coordinates = np.loadtxt(path, delimiter=',', ndmin=2)
+        return cls(coordinates, light_strings, leds_per_string)
+
+    def save(self, path):
+        """
+        Save the coordinates as a text file with one 'x,y,z' line per LED.
+
+        :param path: Path of the coordinate file.
+        """
+        np.savetxt(path, self.coordinates, delimiter=',', fmt='%.4f')
+
+
+def load_tower_map():
+    """
+    Create the LEDMap of the tower from the configuration.
+
+    :return: LEDMap loaded from config.TOWER_MAP_FILE, or generated from the helix
+             model if no file is configured.
+    """
+    if TOWER_MAP_FILE:
+        return LEDMap.from_file(TOWER_MAP_FILE, LIGHT_STRINGS, TOWER_LEDS_PER_STRING)
+    return LEDMap.from_helix(LIGHT_STRINGS, TOWER_LEDS_PER_STRING,
+                             radius=TOWER_RADIUS, height=TOWER_HEIGHT, turns=TOWER_TURNS)
+
+
+def _led_count(leds_per_string, mac_address):
+    if isinstance(leds_per_string, dict):
+        return leds_per_string[mac_address]
+    return leds_per_string
+
+
+def render(effect, led_map, t, out=None):
+    """
+    Evaluate an effect for all LEDs and convert it to WRGB bytes.
+
+    :param effect: Function f(led_map, t) returning an array of shape (number of LEDs, 3)
+                   with RGB values or (number of LEDs, 4) with WRGB values between 0 and 1.
+    :param led_map: The LEDMap.
+    :param t: Time in seconds since the start of the effect.
+    :param out: Optional uint8 array of shape (number of LEDs, 4) to render into.
+    :return: uint8 array of shape (number of LEDs, 4) with one WRGB row per LED.
+    """
+    if out is None:
+        out = np.empty((len(led_map), 4), dtype=np.uint8)
+    values = effect(led_map, t)
+    if values.shape[1] == 3:
+        out[:, 0] = 0  # No white component
+        out[:, 1:] = np.clip(values * 255, 0, 255)
+    else:
+        out[:] = np.clip(values * 255, 0, 255)
+    return out
+
+
+def _colorize(intensity, color):
+    return intensity[:, None] * np.asarray(color, dtype=np.float32)
+
+
+def vertical_sweep(led_map, t, period=4.0, width=0.08, color=(1.0, 0.6, 0.25)):
+    """
+    A band of light moving from the bottom to the top of the tower.
+
+    :param period: Time in seconds for one sweep.
+    :param width: Width of the band relative to the tower height.
+    :param color: RGB colour between 0 and 1.
+    """
+    position = (t / period) % 1.0
+    intensity = np.exp(-np.square((led_map.height - position) / width))
+    return _colorize(intensity, color)
+
+
+def rotating_bands(led_map, t, bands=3, speed=0.25, twist=2.0,
+                   color1=(1.0, 0.0, 0.0), color2=(0.0, 1.0, 0.0)):
+    """
+    Coloured bands rotating around the tower axis.
+
+    :param bands: Number of bands around the tower.
+    :param speed: Rotations per second.
+    :param twist: Number of turns the bands make from bottom to top.
+    :param color1: RGB colour of the bands between 0 and 1.
+    :param color2: RGB colour between the bands between 0 and 1.
+    """
+    phase = led_map.angle + 2 * math.pi * (twist * led_map.height - speed * t)
+    mix = 0.5 + 0.5 * np.sin(bands * phase)
+    return _colorize(mix, color1) + _colorize(1.0 - mix, color2)
+
+
+def radial_convergence(led_map, t, period=3.0, width=0.1, target_height=0.5,
+                       color=(1.0, 0.87, 0.75)):
+    """
+    Rings of light converging on a point on the tower axis.
+
+    :param period: Time in seconds for a ring to reach the target.
+    :param width: Width of the ring relative to the largest distance.
+    :param target_height: Height of the target relative to the tower height.
+    :param color: RGB colour between 0 and 1.
+    """
+    target_z = led_map.z_min + target_height * (led_map.z_max - led_map.z_min)
+    max_distance = math.hypot(led_map.max_radius, max(target_z - led_map.z_min, led_map.z_max - target_z))
+    distance = np.sqrt(np.square(led_map.radius) + np.square(led_map.z - target_z))
+    distance /= max(max_distance, 1e-6)
+    ring = 1.0 - (t / period) % 1.0
+    intensity = np.exp(-np.square((distance - ring) / width))
+    return _colorize(intensity, color)
+
+
+# Effects that can be selected by name (e.g. by the distributed renderer)
+EFFECTS = ['vertical_sweep', 'rotating_bands', 'radial_convergence']
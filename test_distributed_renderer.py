@@ -0,0 +1,38 @@
+import queue
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from distributed_renderer import DEFAULT_AUTHKEY, Coordinator, run_local
+
+
+def test_run_local_with_many_workers():
+    # More workers than the default listen backlog connect at the same time
+    stats = run_local(7, 'vertical_sweep', duration=0.5, fps=20, emulate=True, connect_timeout=20)
+    assert len(stats) == 7
+    assert all(worker_stats['frames'] + worker_stats['dropped_frames'] == 10 for worker_stats in stats.values())
+
+
+def test_accept_loop_survives_failed_connection():
+    coordinator = Coordinator(address=('127.0.0.1', 0))
+    connections = queue.Queue()
+    threading.Thread(target=coordinator._accept_loop, args=(1, connections), daemon=True).start()
+    try:
+        with pytest.raises(AuthenticationError):
+            Client(coordinator.address, authkey=b'wrong key')
+        client = Client(coordinator.address, authkey=DEFAULT_AUTHKEY)
+        assert connections.get(timeout=5) is not None
+        client.close()
+    finally:
+        coordinator.shutdown()
+
+
+def test_unknown_effect_is_rejected():
+    coordinator = Coordinator(address=('127.0.0.1', 0))
+    try:
+        with pytest.raises(ValueError):
+            coordinator.run_effect('no_such_effect')
+    finally:
+        coordinator.shutdown()
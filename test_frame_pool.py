@@ -0,0 +1,22 @@
+from headless import create_light_strings
+from frame_pool import FrameBuffer, measure_allocations
+from light_string_manager import LightStringManager
+
+
+def test_frame_buffer_encodes_wrgb():
+    buffer = FrameBuffer.from_colors([(1, 2, 3, 4), (5, 6, 7, 8)])
+    assert buffer.view.tobytes() == bytes([1, 2, 3, 4, 5, 6, 7, 8])
+    buffer.fill((9, 9, 9, 9))
+    assert buffer.view.tobytes() == bytes([9] * 8)
+
+
+def test_converging_effect_does_not_allocate_per_frame():
+    manager = LightStringManager(light_strings=create_light_strings(7, 400))
+
+    def step():
+        manager.run_converging_effect(target_index=3, duration=1, fps=30, realtime=False)
+
+    retained, peak = measure_allocations(step, frames=10, warmup=2)
+    # 10 x 30 frames of 7 x 1600 bytes would allocate over 3 MiB without the pool
+    assert retained < 4096
+    assert peak < 16384
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class ChromeTracer:
+    def __init__(self, path, sample_rate=1.0, max_events=1_000_000):
+        """
+        Record timeline spans and write them as a Chrome trace-event JSON file,
+        viewable in Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+
+        Spans outside of frames (discovery, turn on, ...) are always recorded.
+        Spans inside frames are only recorded for sampled frames.
+
+        :param path: Output file for the trace.
+        :param sample_rate: Fraction of frames to record (1.0 = every frame,
+                            0.1 = every tenth frame).
+        :param max_events: Upper bound on recorded events, further events are dropped.
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 (exclusive) and 1")
+        self.path = path
+        self.sample_every = max(1, round(1 / sample_rate))
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self.frame_index = -1
+        self.in_frame = False
+        self.frame_sampled = True
+        self._pid = os.getpid()
+        self._start = time.perf_counter()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._start) * 1e6
+
+    @contextmanager
+    def frame(self):
+        """
+        Context manager enclosing one frame and deciding whether it is sampled.
+
+        The frame state is reset on leaving the block, also when the frame is
+        interrupted by an exception, so later spans are recorded again.
+        """
+        self.frame_index += 1
+        self.in_frame = True
+        self.frame_sampled = self.frame_index % self.sample_every == 0
+        try:
+            yield
+        finally:
+            self.in_frame = False
+            self.frame_sampled = True
+
+    def span(self, name, category='show', **args):
+        """
+        Context manager recording the duration of the enclosed block.
+
+        :param name: Name of the span (e.g. 'render', 'send').
+        :param category: Trace category, used for filtering in the viewer.
+        :param args: Additional values shown with the span (e.g. the device).
+        """
+        if not self.frame_sampled:
+            return nullcontext()
+        if self.in_frame:
+            args.setdefault('frame', self.frame_index)
+        return self._record(name, category, args)
+
+    @contextmanager
+    def _record(self, name, category, args):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    'name': name,
+                    'cat': category,
+                    'ph': 'X',
+                    'ts': start,
+                    'dur': self._now_us() - start,
+                    'pid': self._pid,
+                    'tid': threading.get_ident(),
+                    'args': args,
+                })
+            else:
+                self.dropped_events += 1
+
+    def write(self):
+        """
+        Write all recorded spans to the trace file.
+        """
+        with open(self.path, 'w') as f:
+            json.dump({
+                'traceEvents': self.events,
+                'displayTimeUnit': 'ms',
+                'otherData': {
+                    'sample_every': self.sample_every,
+                    'dropped_events': self.dropped_events,
+                },
+            }, f)
+        print(f"Trace mit {len(self.events)} Ereignissen geschrieben: {self.path}")
+
+
+class NullTracer:
+    """
+    Tracer used when tracing is disabled. All operations are no-ops.
+    """
+    _null_span = nullcontext()
+
+    def frame(self):
+        return self._null_span
+
+    def span(self, name, category='show', **args):
+        return self._null_span
+
+    def write(self):
+        pass
+
+
+_tracer = NullTracer()
+
+
+def enable(path, sample_rate=1.0):
+    """
+    Enable tracing for the whole process.
+
+    :param path: Output file for the Chrome trace.
+    :param sample_rate: Fraction of frames to record.
+    :return: The active ChromeTracer.
+    """
+    global _tracer
+    _tracer = ChromeTracer(path, sample_rate)
+    return _tracer
+
+
+def disable():
+    """
+    Disable tracing. Recorded spans are discarded unless written before.
+    """
+    global _tracer
+    _tracer = NullTracer()
+
+
+def get_tracer():
+    """
+    Return the active tracer (a NullTracer if tracing is disabled).
+    """
+    return _tracer